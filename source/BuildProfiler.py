@@ -0,0 +1,338 @@
+"""MIT License
+
+Copyright (c) 2024 Keith Lostracco
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import json
+import os
+import re
+import time
+
+# Object files compiled from plugin sources, e.g. CMakeFiles/Foo.dir/source/Foo.cpp.obj
+TU_OUTPUT_RE = re.compile(r'\.(c|cc|cpp|cxx|cu)\.(o|obj)$')
+
+# Ninja status line announcing a compile step, e.g. [1/3] Building CXX object CMakeFiles/...
+NINJA_STATUS_RE = re.compile(r'^\[\d+/\d+\] Building \w+ object (\S+)')
+
+# MSVC /d1reportTime entries, e.g. "	c:\path\header.h: 0.012345s"
+MSVC_TIME_RE = re.compile(r'^\s+(.+?):\s+([\d.]+)s\b')
+MSVC_SECTION_RE = re.compile(r'^\s*(Include Headers|Class Definitions|Function Definitions):')
+
+# GCC -ftime-report header naming the columns, e.g. "Time variable    usr    sys    wall    GGC",
+# and its entries, e.g. " phase parsing  :   0.50 ( 50%)   0.01 ( 10%)   0.52 ( 50%) 1234k ( 40%)"
+GCC_HEADER_RE = re.compile(r'^\s*Time variable\s+(.*)$')
+GCC_TIME_RE = re.compile(r'^\s*([^:]+?)\s*:((?:\s*[\d.]+[kMG]?\s*\(\s*\d+%\))+)')
+GCC_COLUMN_RE = re.compile(r'([\d.]+)[kMG]?\s*\(\s*\d+%\)')
+
+CLANG_PARSE_EVENTS = ('Source',)
+CLANG_TEMPLATE_EVENTS = ('InstantiateClass', 'InstantiateFunction')
+
+HISTORY_FILE = 'history.jsonl'
+
+
+class BuildProfiler:
+	"""
+	Collects per translation unit compile times from a ninja build directory
+	and the compiler's time-trace/time-report output into a ranked report.
+
+	"""
+	def __init__(self, working_dir, profile_dir='profiles', top=10):
+		self.working_dir = working_dir
+		self.profile_dir = profile_dir
+		self.top = top
+		self.compiler_output = {}
+		self._current_tu = None
+		self.log_offset = None
+		self.mark_time = None
+
+	############## Properties #####################################################################
+
+	@property
+	def build_dir(self):
+		return f"{self.working_dir}/build"
+
+	@property
+	def ninja_log_path(self):
+		return f"{self.build_dir}/.ninja_log"
+
+	@property
+	def history_path(self):
+		return f"{self.working_dir}/{self.profile_dir}/{HISTORY_FILE}"
+
+	############## Ninja Log ######################################################################
+
+	def mark(self, log_offset=None, mark_time=None):
+		"""
+		Remembers where the ninja log ends, call before sending a ninja command.
+		A build server passes the log size and time it recorded when starting ninja.
+
+		"""
+		if log_offset is None:
+			try:
+				log_offset = os.path.getsize(self.ninja_log_path)
+			except OSError:
+				log_offset = 0
+		self.log_offset = log_offset
+		self.mark_time = mark_time if mark_time is not None else time.time()
+
+	def parse_ninja_log_lines(self, lines):
+		"""Returns {output: ms} for the steps in lines, keeping the last entry of each output."""
+
+		steps = {}
+		for line in lines:
+			if line.startswith('#'):
+				continue
+			fields = line.rstrip('\n').split('\t')
+			if len(fields) < 5:
+				continue
+			steps[fields[3]] = int(fields[1]) - int(fields[0])
+		return steps
+
+	def read_ninja_log(self):
+		"""Returns the compile steps run since mark() as {output: ms}."""
+
+		if self.log_offset is None or not os.path.exists(self.ninja_log_path):
+			return {}
+
+		with open(self.ninja_log_path, 'rb') as f:
+			f.seek(0, os.SEEK_END)
+			size = f.tell()
+			# a log shorter than the mark was recompacted by ninja and rewritten in any order
+			recompacted = size < self.log_offset
+			f.seek(0 if recompacted else self.log_offset)
+			lines = f.read().decode('utf-8', errors='replace').splitlines()
+
+		steps = self.parse_ninja_log_lines(lines)
+
+		if recompacted:
+			built = {}
+			for output, ms in steps.items():
+				try:
+					mtime = os.path.getmtime(f"{self.build_dir}/{output}")
+				except OSError:
+					continue
+				if mtime >= self.mark_time:
+					built[output] = ms
+			steps = built
+
+		return {output: ms for output, ms in steps.items() if TU_OUTPUT_RE.search(output)}
+
+	############## Compiler Output ################################################################
+
+	def collect_output(self, line):
+		"""Attributes a line of build output to the translation unit being compiled."""
+
+		match = NINJA_STATUS_RE.match(line)
+		if match:
+			# only the output of the latest compile of a translation unit is kept
+			self._current_tu = match.group(1)
+			self.compiler_output[self._current_tu] = []
+			return
+
+		if self._current_tu is not None:
+			self.compiler_output[self._current_tu].append(line)
+
+	def parse_time_trace(self, path):
+		"""Reads a clang -ftime-trace json file into header and template costs in ms."""
+
+		headers, templates = {}, {}
+		try:
+			with open(path, 'r') as f:
+				trace = json.load(f)
+		except (OSError, ValueError):
+			return headers, templates
+
+		parse_events, template_events = [], []
+		for event in trace.get('traceEvents', []):
+			if event.get('ph') != 'X':
+				continue
+			if event.get('name') in CLANG_PARSE_EVENTS:
+				parse_events.append(event)
+			elif event.get('name') in CLANG_TEMPLATE_EVENTS:
+				template_events.append(event)
+
+		for costs, events in ((headers, parse_events), (templates, template_events)):
+			for detail, ms in self.self_times(events):
+				costs[detail] = costs.get(detail, 0.0) + ms
+
+		return headers, templates
+
+	def self_times(self, events):
+		"""Returns (detail, ms) of nested trace spans with the time of their child spans removed."""
+
+		# spans of one kind nest on the same thread, e.g. an included header's Source
+		# span lies inside its includer's, so the enclosing span is found with a stack.
+		events = sorted(events, key=lambda event: (event.get('tid', 0), event.get('ts', 0), -event.get('dur', 0)))
+		self_us = [event.get('dur', 0) for event in events]
+		stack = []
+		for index, event in enumerate(events):
+			start = event.get('ts', 0)
+			while stack and (events[stack[-1]].get('tid', 0) != event.get('tid', 0)
+					or events[stack[-1]].get('ts', 0) + events[stack[-1]].get('dur', 0) <= start):
+				stack.pop()
+			if stack:
+				self_us[stack[-1]] -= event.get('dur', 0)
+			stack.append(index)
+
+		return [(event.get('args', {}).get('detail', ''), max(us, 0) / 1000.0) for event, us in zip(events, self_us)]
+
+	def parse_time_report(self, lines):
+		"""Reads MSVC /d1reportTime or GCC -ftime-report output into header and template costs in ms."""
+
+		headers, templates = {}, {}
+		section = None
+		gcc_wall = None
+		# MSVC lists nested includes indented below their includer with inclusive
+		# times, the stack of (depth, name) removes the nested time from each parent.
+		include_stack = []
+		for line in lines:
+			match = MSVC_SECTION_RE.match(line)
+			if match:
+				section = match.group(1)
+				include_stack = []
+				continue
+
+			match = GCC_HEADER_RE.match(line)
+			if match:
+				# the columns depend on the gcc version and host, only wall time is used
+				columns = match.group(1).split()
+				gcc_wall = columns.index('wall') if 'wall' in columns else None
+				continue
+
+			match = GCC_TIME_RE.match(line)
+			if match and gcc_wall is not None:
+				values = GCC_COLUMN_RE.findall(match.group(2))
+				if gcc_wall >= len(values):
+					continue
+				name, wall = match.group(1), float(values[gcc_wall]) * 1000.0
+				if name == 'phase parsing':
+					headers['<parsing>'] = headers.get('<parsing>', 0.0) + wall
+				elif name.startswith('template instantiation'):
+					templates['<instantiation>'] = templates.get('<instantiation>', 0.0) + wall
+				continue
+
+			match = MSVC_TIME_RE.match(line)
+			if match and section is not None:
+				name, ms = match.group(1).strip(), float(match.group(2)) * 1000.0
+				if section == 'Include Headers':
+					depth = len(line) - len(line.lstrip())
+					while include_stack and include_stack[-1][0] >= depth:
+						include_stack.pop()
+					if include_stack:
+						parent = include_stack[-1][1]
+						headers[parent] = headers.get(parent, 0.0) - ms
+					headers[name] = headers.get(name, 0.0) + ms
+					include_stack.append((depth, name))
+				elif section == 'Class Definitions':
+					# Function Definitions are code generation, not template instantiation
+					templates[name] = templates.get(name, 0.0) + ms
+
+		return headers, templates
+
+	############## Report #########################################################################
+
+	def profile(self, build_config=''):
+		"""Builds a report for the most recent build and appends it to the history."""
+
+		tus = self.read_ninja_log()
+		headers, templates = {}, {}
+
+		for output in tus:
+			trace_path = f"{self.build_dir}/{os.path.splitext(output)[0]}.json"
+			if os.path.exists(trace_path):
+				tu_headers, tu_templates = self.parse_time_trace(trace_path)
+			else:
+				tu_headers, tu_templates = self.parse_time_report(self.compiler_output.get(output, []))
+
+			for name, ms in tu_headers.items():
+				headers[name] = headers.get(name, 0.0) + ms
+			for name, ms in tu_templates.items():
+				templates[name] = templates.get(name, 0.0) + ms
+
+		report = {
+			'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+			'config': build_config,
+			'total_ms': sum(tus.values()),
+			'tus': self.ranked(tus),
+			'headers': self.ranked(headers),
+			'templates': self.ranked(templates),
+		}
+
+		self.compiler_output = {}
+		self._current_tu = None
+		self.log_offset = None
+		self.mark_time = None
+
+		if report['tus']:
+			self.append_history(report)
+
+		return report
+
+	def ranked(self, costs):
+		"""Returns the most expensive entries as [name, ms] pairs, slowest first."""
+
+		items = sorted(costs.items(), key=lambda item: item[1], reverse=True)
+		return [[name, round(ms, 3)] for name, ms in items[:self.top]]
+
+	def append_history(self, report):
+		os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+		with open(self.history_path, 'a') as f:
+			f.write(json.dumps(report) + '\n')
+
+	def read_history(self):
+		"""Returns all previous reports, oldest first."""
+
+		if not os.path.exists(self.history_path):
+			return []
+
+		history = []
+		with open(self.history_path, 'r') as f:
+			for line in f:
+				try:
+					history.append(json.loads(line))
+				except ValueError:
+					pass
+		return history
+
+	def format_report(self, report, previous=None):
+		"""Formats a report as text, comparing per TU times against the previous report."""
+
+		prev_tus = dict(previous['tus']) if previous else {}
+		delta = ''
+		if previous:
+			delta = f" ({report['total_ms'] - previous['total_ms']:+d} ms vs {previous['time']})"
+
+		lines = [f"Build profile {report['time']} {report['config']}: {report['total_ms']} ms{delta}"]
+
+		lines.append('  Translation units (wall time):')
+		for name, ms in report['tus']:
+			change = f" ({ms - prev_tus[name]:+.0f} ms)" if name in prev_tus else ''
+			lines.append(f"    {ms:10.0f} ms  {name}{change}")
+
+		lines.append('  Header parsing (self time):')
+		for name, ms in report['headers']:
+			lines.append(f"    {ms:10.1f} ms  {name}")
+
+		lines.append('  Template instantiation (self time):')
+		for name, ms in report['templates']:
+			lines.append(f"    {ms:10.1f} ms  {name}")
+
+		return '\n'.join(lines)
@@ -0,0 +1,607 @@
+"""MIT License
+
+Copyright (c) 2024 Keith Lostracco
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import collections
+import configparser
+import hmac
+import itertools
+import json
+import os
+import queue
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 50007
+
+BUILD_CONFIGS = ('Debug', 'Release', 'RelWithDebInfo')
+JOB_KINDS = ('configure', 'build')
+
+# Longest request line accepted from a client
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+def normalize_dir(path):
+	return os.path.normcase(os.path.abspath(path))
+
+
+def toolchain_env(vcvarsall=None, ninja_dir=None):
+	"""Returns the environment builds run in, initialized once by vcvarsall if given."""
+
+	env = dict(os.environ)
+
+	if vcvarsall:
+		result = subprocess.run(f'"{vcvarsall}" x64 && set', shell=True, capture_output=True, text=True)
+		if result.returncode != 0:
+			raise RuntimeError(f"vcvarsall failed: {result.stdout}{result.stderr}")
+		for line in result.stdout.splitlines():
+			key, sep, value = line.partition('=')
+			if sep and key:
+				env[key] = value
+
+	if ninja_dir:
+		env['PATH'] = env.get('PATH', '') + os.pathsep + ninja_dir
+
+	return env
+
+
+class BuildRequestError(Exception):
+	"""A request the server refuses, the connection is closed after reporting it."""
+
+
+class BuildJob:
+	"""A configure or build of one plugin project, run in its build directory."""
+
+	_ids = itertools.count(1)
+
+	def __init__(self, build_dir, kind, config, profile):
+		self.id = next(self._ids)
+		self.build_dir = build_dir
+		self.kind = kind
+		self.config = config
+		self.profile = profile
+		self.state = 'pending'
+		self.returncode = None
+		self.artifact = None
+
+	@property
+	def name(self):
+		return os.path.basename(self.build_dir)
+
+	def matches(self, build_dir, kind, config, profile):
+		return (self.build_dir, self.kind, self.config, self.profile) == (build_dir, kind, config, profile)
+
+
+class SourceWatch:
+	"""Polls the source directory of a plugin project and remembers its last seen modification times."""
+
+	def __init__(self, build_dir, config, profile):
+		self.build_dir = build_dir
+		self.source_dir = os.path.join(build_dir, 'source')
+		self.config = config
+		self.profile = profile
+		self.clients = set()
+		self.snapshot = self.scan()
+
+	def scan(self):
+		snapshot = {}
+		for root, _, files in os.walk(self.source_dir):
+			for file_name in files:
+				path = os.path.join(root, file_name)
+				try:
+					snapshot[path] = os.stat(path).st_mtime_ns
+				except OSError:
+					pass
+		return snapshot
+
+	def changed(self):
+		snapshot = self.scan()
+		changed = snapshot != self.snapshot
+		self.snapshot = snapshot
+		return changed
+
+
+class BuildServer:
+	"""
+	Shared build server for all PluginBuilder instances on a machine.
+
+	One server process owns the toolchain environment, the source watchers and
+	the build queue. Clients talk to it over a local socket with one json object
+	per line, each carrying the shared token from settings.ini. Clients only
+	choose a plugin project, a job kind and a build config, the cmake and ninja
+	commands are built here. Jobs for the same plugin project run one at a time
+	in submission order, including the copy of the built dll to Plugins/, jobs
+	for different projects run in parallel. A job identical to one still waiting
+	in its queue is not queued twice.
+
+	"""
+	def __init__(self, token, project_roots, host=DEFAULT_HOST, port=DEFAULT_PORT, env=None,
+				 plugin_builder_dir='', cmake=('cmake',), ninja=('ninja',), max_parallel=4, poll_interval=0.25):
+		if not token:
+			raise ValueError("The build server requires a token.")
+
+		self.token = token
+		self.projects_dirs = [normalize_dir(os.path.join(root, 'PluginProjects')) for root in project_roots]
+		self.env = env if env is not None else dict(os.environ)
+		self.plugin_builder_dir = plugin_builder_dir
+		self.cmake = self.resolve_tool(cmake)
+		self.ninja = self.resolve_tool(ninja)
+		self.poll_interval = poll_interval
+		self.slots = threading.Semaphore(max_parallel)
+
+		self.lock = threading.Lock()
+		self.pending = collections.defaultdict(collections.deque)
+		self.running = set()
+		self.subscribers = collections.defaultdict(set)
+		self.watches = {}
+		self.stopped = threading.Event()
+
+		self.server = socketserver.ThreadingTCPServer((host, port), BuildRequestHandler, bind_and_activate=False)
+		self.server.daemon_threads = True
+		self.server.build_server = self
+		self.server.server_bind()
+		self.server.server_activate()
+
+		self.watch_thread = threading.Thread(target=self._watch_loop, daemon=True)
+
+	@property
+	def address(self):
+		return self.server.server_address
+
+	def resolve_tool(self, tool):
+		"""Finds a tool on the PATH of the build environment, which Popen does not search on Windows."""
+
+		tool = list(tool)
+		found = shutil.which(tool[0], path=self.env.get('PATH'))
+		if found is not None:
+			tool[0] = found
+		return tool
+
+	############## Lifecycle ######################################################################
+
+	def serve_forever(self):
+		self.watch_thread.start()
+		try:
+			self.server.serve_forever()
+		finally:
+			self.stopped.set()
+			self.server.server_close()
+
+	def shutdown(self):
+		self.stopped.set()
+		threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+	############## Validation #####################################################################
+
+	def check_token(self, token):
+		if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+			raise BuildRequestError("Invalid token.")
+
+	def check_build_dir(self, build_dir):
+		"""Returns the normalized build dir if it is a plugin project in a known PluginProjects folder."""
+
+		if not isinstance(build_dir, str):
+			raise BuildRequestError("build_dir must be a string.")
+
+		build_dir = normalize_dir(build_dir)
+		if os.path.dirname(build_dir) not in self.projects_dirs:
+			raise BuildRequestError(f"{build_dir} is not in a known PluginProjects folder.")
+
+		if not os.path.isfile(os.path.join(build_dir, 'CMakeLists.txt')):
+			raise BuildRequestError(f"{build_dir} has no CMakeLists.txt.")
+
+		return build_dir
+
+	def check_options(self, config, profile):
+		if config not in BUILD_CONFIGS:
+			raise BuildRequestError(f"Unknown build config: {config}")
+		if not isinstance(profile, bool):
+			raise BuildRequestError("profile must be true or false.")
+
+	############## Jobs ###########################################################################
+
+	def job_commands(self, job):
+		if job.kind == 'configure':
+			return [self.cmake + [
+				'-B', 'build', '-G', 'Ninja',
+				f"-DPLUGIN_BUILDER_DIR={self.plugin_builder_dir}",
+				f"-DPLUGIN_DIR=Plugins/{job.name}",
+				f"-DCMAKE_BUILD_TYPE={job.config}",
+				f"-DPLUGIN_BUILDER_PROFILE={'ON' if job.profile else 'OFF'}",
+			]]
+		return [self.ninja + ['-C', 'build']]
+
+	def submit(self, build_dir, kind, config, profile):
+		"""Queues a job and returns it, or the identical job already waiting in the queue."""
+
+		with self.lock:
+			for job in self.pending[build_dir]:
+				if job.matches(build_dir, kind, config, profile):
+					return job, True
+
+			job = BuildJob(build_dir, kind, config, profile)
+			self.pending[build_dir].append(job)
+			if build_dir not in self.running:
+				self.running.add(build_dir)
+				threading.Thread(target=self._run_queue, args=(build_dir,), daemon=True).start()
+
+		return job, False
+
+	def _run_queue(self, build_dir):
+		"""Runs the jobs of one plugin project one after another until its queue is empty."""
+
+		while True:
+			with self.lock:
+				if not self.pending[build_dir]:
+					del self.pending[build_dir]
+					self.running.discard(build_dir)
+					return
+				job = self.pending[build_dir].popleft()
+				job.state = 'running'
+
+			with self.slots:
+				self._run_job(job)
+
+	def _run_job(self, job):
+		started = {'event': 'started', 'job': job.id, 'kind': job.kind}
+		if job.kind == 'build':
+			# lets a client profiling the build read only the steps ninja is about to log
+			try:
+				started['log_offset'] = os.path.getsize(os.path.join(job.build_dir, 'build', '.ninja_log'))
+			except OSError:
+				started['log_offset'] = 0
+			started['time'] = time.time()
+		self.publish(job.build_dir, started)
+
+		env = dict(self.env)
+		env['PLUGINBUILDER_BUILD'] = '""'
+
+		job.returncode = 0
+		for command in self.job_commands(job):
+			try:
+				process = subprocess.Popen(
+					command,
+					stdout=subprocess.PIPE,
+					stderr=subprocess.STDOUT,
+					text=True,
+					bufsize=1,  # Line-buffered
+					cwd=job.build_dir,
+					env=env
+				)
+			except OSError as e:
+				self.publish(job.build_dir, {'event': 'output', 'job': job.id, 'line': f"{e}\n"})
+				job.returncode = -1
+				break
+
+			for line in process.stdout:
+				self.publish(job.build_dir, {'event': 'output', 'job': job.id, 'line': line})
+			process.stdout.close()
+
+			job.returncode = process.wait()
+			if job.returncode != 0:
+				break
+
+		if job.kind == 'build' and job.returncode == 0:
+			self._copy_artifact(job)
+
+		job.state = 'done'
+		self.publish(job.build_dir, {'event': 'finished', 'job': job.id, 'kind': job.kind,
+									 'returncode': job.returncode, 'artifact': job.artifact})
+
+	def _copy_artifact(self, job):
+		"""Copies the built dll to Plugins/<name>/ as the last step of a build job."""
+
+		src = os.path.join(job.build_dir, 'build', 'bin', job.config, f"{job.name}.dll")
+		plugin_dir = os.path.join(os.path.dirname(os.path.dirname(job.build_dir)), 'Plugins', job.name)
+		dst = os.path.join(plugin_dir, f"{job.name}.dll")
+
+		if not os.path.exists(src):
+			self.publish(job.build_dir, {'event': 'output', 'job': job.id, 'line': f"File {src} does not exist.\n"})
+			job.returncode = -1
+			return
+
+		try:
+			os.makedirs(plugin_dir, exist_ok=True)
+			tmp = f"{dst}.tmp"
+			shutil.copyfile(src, tmp)
+			# a dll loaded by TouchDesigner can not be overwritten on Windows but it
+			# can be renamed, so the loaded one is moved aside before replacing it.
+			if os.path.exists(dst):
+				old = f"{dst}.old"
+				try:
+					if os.path.exists(old):
+						os.remove(old)
+				except OSError:
+					pass
+				if not os.path.exists(old):
+					os.replace(dst, old)
+			os.replace(tmp, dst)
+		except OSError as e:
+			self.publish(job.build_dir, {'event': 'output', 'job': job.id, 'line': f"Could not copy {src}: {e}\n"})
+			job.returncode = -1
+			return
+
+		job.artifact = dst
+
+	############## Clients ########################################################################
+
+	def subscribe(self, client, build_dir):
+		with self.lock:
+			self.subscribers[build_dir].add(client)
+
+	def watch(self, client, build_dir, config, profile):
+		with self.lock:
+			watch = self.watches.get(build_dir)
+			if watch is None:
+				watch = SourceWatch(build_dir, config, profile)
+				self.watches[build_dir] = watch
+			watch.config = config
+			watch.profile = profile
+			watch.clients.add(client)
+			self.subscribers[build_dir].add(client)
+
+	def unwatch(self, client, build_dir):
+		with self.lock:
+			watch = self.watches.get(build_dir)
+			if watch is not None:
+				watch.clients.discard(client)
+				if not watch.clients:
+					del self.watches[build_dir]
+
+	def disconnect(self, client):
+		with self.lock:
+			for build_dir in list(self.subscribers):
+				self.subscribers[build_dir].discard(client)
+				if not self.subscribers[build_dir]:
+					del self.subscribers[build_dir]
+
+			for build_dir in list(self.watches):
+				self.watches[build_dir].clients.discard(client)
+				if not self.watches[build_dir].clients:
+					del self.watches[build_dir]
+
+	def publish(self, build_dir, event):
+		event['build_dir'] = build_dir
+		with self.lock:
+			clients = list(self.subscribers.get(build_dir, ()))
+		for client in clients:
+			client.send(event)
+
+	def _watch_loop(self):
+		while not self.stopped.wait(self.poll_interval):
+			with self.lock:
+				watches = list(self.watches.values())
+			for watch in watches:
+				if watch.changed():
+					self.submit(watch.build_dir, 'build', watch.config, watch.profile)
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+	"""Serves one client connection, one json request per line."""
+
+	def setup(self):
+		super().setup()
+		self.write_lock = threading.Lock()
+
+	def send(self, message):
+		data = (json.dumps(message) + '\n').encode('utf-8')
+		try:
+			with self.write_lock:
+				self.wfile.write(data)
+				self.wfile.flush()
+		except (OSError, ValueError):
+			# the client disconnected while its project was still building
+			pass
+
+	def handle(self):
+		build_server = self.server.build_server
+		try:
+			while True:
+				raw = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+				if not raw:
+					return
+				try:
+					if len(raw) > MAX_REQUEST_BYTES:
+						raise BuildRequestError("Request too long.")
+					try:
+						request = json.loads(raw)
+					except ValueError:
+						raise BuildRequestError("Request is not json.")
+					if not isinstance(request, dict):
+						raise BuildRequestError("Request is not a json object.")
+					build_server.check_token(request.get('token'))
+					self.dispatch(build_server, request)
+				except BuildRequestError as e:
+					# anything that is not a valid request, e.g. a browser posting
+					# to the port, ends the connection.
+					self.send({'event': 'error', 'message': str(e)})
+					return
+		except OSError:
+			pass
+		finally:
+			build_server.disconnect(self)
+
+	def dispatch(self, build_server, request):
+		op = request.get('op')
+
+		if op == 'shutdown':
+			build_server.shutdown()
+			return
+
+		if op not in ('submit', 'subscribe', 'watch', 'unwatch'):
+			raise BuildRequestError(f"Unknown op: {op}")
+
+		build_dir = build_server.check_build_dir(request.get('build_dir'))
+
+		if op == 'submit':
+			kind, config, profile = request.get('kind'), request.get('config'), request.get('profile', False)
+			if kind not in JOB_KINDS:
+				raise BuildRequestError(f"Unknown job kind: {kind}")
+			build_server.check_options(config, profile)
+			build_server.subscribe(self, build_dir)
+			job, deduped = build_server.submit(build_dir, kind, config, profile)
+			self.send({'event': 'queued', 'job': job.id, 'build_dir': build_dir, 'kind': kind, 'deduped': deduped})
+		elif op == 'subscribe':
+			build_server.subscribe(self, build_dir)
+		elif op == 'watch':
+			config, profile = request.get('config'), request.get('profile', False)
+			build_server.check_options(config, profile)
+			build_server.watch(self, build_dir, config, profile)
+		elif op == 'unwatch':
+			build_server.unwatch(self, build_dir)
+
+
+class BuildClient:
+	"""
+	Connection to a BuildServer. Events are received on a reader thread and
+	put on the events queue, output lines are also put on output_queue. The
+	disconnected event is set once the server closed the connection, e.g. after
+	refusing the token or when it stopped.
+
+	"""
+	def __init__(self, token, host=DEFAULT_HOST, port=DEFAULT_PORT, output_queue=None, timeout=2.0):
+		self.token = token
+		self.sock = socket.create_connection((host, port), timeout=timeout)
+		self.sock.settimeout(None)
+		self.rfile = self.sock.makefile('r', encoding='utf-8')
+		self.write_lock = threading.Lock()
+		self.events = queue.Queue()
+		self.output_queue = output_queue
+		self.disconnected = threading.Event()
+
+		self.reader_thread = threading.Thread(target=self._reader, daemon=True)
+		self.reader_thread.start()
+
+	def _reader(self):
+		try:
+			for raw in self.rfile:
+				event = json.loads(raw)
+				self.events.put(event)
+				if self.output_queue is None:
+					continue
+				if event['event'] == 'output':
+					self.output_queue.put(event['line'])
+				elif event['event'] == 'finished' and event['returncode'] != 0:
+					self.output_queue.put(f"Build server job {event['job']} failed with code {event['returncode']}.\n")
+				elif event['event'] == 'error':
+					self.output_queue.put(f"Build server error: {event['message']}\n")
+		except (OSError, ValueError):
+			pass
+		finally:
+			self.disconnected.set()
+
+	def send(self, request):
+		request['token'] = self.token
+		try:
+			with self.write_lock:
+				self.sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+		except OSError:
+			self.disconnected.set()
+			raise
+
+	def submit(self, build_dir, kind, config, profile=False):
+		self.send({'op': 'submit', 'build_dir': build_dir, 'kind': kind, 'config': config, 'profile': profile})
+
+	def subscribe(self, build_dir):
+		self.send({'op': 'subscribe', 'build_dir': build_dir})
+
+	def watch(self, build_dir, config, profile=False):
+		self.send({'op': 'watch', 'build_dir': build_dir, 'config': config, 'profile': profile})
+
+	def unwatch(self, build_dir):
+		self.send({'op': 'unwatch', 'build_dir': build_dir})
+
+	def close(self):
+		try:
+			self.sock.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+		self.sock.close()
+		self.reader_thread.join(timeout=1.0)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Shared PluginBuilder build server.')
+	parser.add_argument('--host', default=DEFAULT_HOST)
+	parser.add_argument('--port', type=int, default=None, help='0 picks a free port.')
+	parser.add_argument('--settings', help='PluginBuilder settings.ini to read the paths, token and project roots from.')
+	parser.add_argument('--token', help='Shared token clients have to send with every request.')
+	parser.add_argument('--project-root', action='append', default=[],
+						help='TouchDesigner project folder whose PluginProjects may be built, can be repeated.')
+	parser.add_argument('--plugin-builder-dir', help='PluginBuilder directory passed to cmake.')
+	parser.add_argument('--vcvarsall', help='vcvarsall.bat used to initialize the toolchain environment.')
+	parser.add_argument('--ninja-dir', help='Directory added to PATH for ninja.')
+	parser.add_argument('--jobs', type=int, default=4, help='Maximum number of projects building in parallel.')
+	args = parser.parse_args(argv)
+
+	port = args.port
+	token = args.token
+	project_roots = list(args.project_root)
+	plugin_builder_dir = args.plugin_builder_dir
+	vcvarsall = args.vcvarsall
+	ninja_dir = args.ninja_dir
+
+	if args.settings:
+		config = configparser.ConfigParser()
+		config.read(args.settings)
+		user_home = os.environ.get('USERPROFILE', os.environ.get('HOME', ''))
+		def get_path(section, key):
+			value = config.get(section, key, fallback=None)
+			return value.replace('${USER_PATH}', user_home) if value else None
+		plugin_builder_dir = plugin_builder_dir or get_path('Paths', 'PluginBuilderDir')
+		vcvarsall = vcvarsall or get_path('Paths', 'VCVarsall')
+		ninja_dir = ninja_dir or get_path('Paths', 'NinjaDir')
+		token = token or config.get('BuildServer', 'Token', fallback=None)
+		roots = get_path('BuildServer', 'ProjectRoots') or ''
+		project_roots += [root.strip() for root in roots.split(';') if root.strip()]
+		if port is None:
+			port = config.getint('BuildServer', 'Port', fallback=DEFAULT_PORT)
+
+	if port is None:
+		port = DEFAULT_PORT
+
+	if not token:
+		parser.error("a token is required, pass --token or set Token in the [BuildServer] section of settings.ini")
+	if not project_roots:
+		parser.error("no project roots, pass --project-root or set ProjectRoots in the [BuildServer] section of settings.ini")
+
+	env = toolchain_env(vcvarsall, ninja_dir)
+	build_server = BuildServer(token, project_roots, args.host, port, env=env,
+							   plugin_builder_dir=plugin_builder_dir or '', max_parallel=args.jobs)
+	host, port = build_server.address
+	print(f"PluginBuilder build server listening on {host}:{port}", flush=True)
+
+	try:
+		build_server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == '__main__':
+	sys.exit(main())
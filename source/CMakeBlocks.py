@@ -1,4 +1,4 @@
-start_block = '''# {'plugin_type': __PLUGIN_TYPE__}
+start_block = '''# {'plugin_type': __PLUGIN_TYPE__, 'template': __PLUGIN_TEMPLATE__}
 cmake_minimum_required (VERSION 3.21)
 
 # Enable Hot Reload for MSVC compilers if supported.
@@ -76,6 +76,22 @@ else()
     COMMAND ${CMAKE_COMMAND} -E copy_if_different
     $<TARGET_FILE:__PLUGIN_NAME__> "${PLUGIN_DIR}")
 endif()
+
+# Compile time profiling, per translation unit reports are collected by PluginBuilder
+option(PLUGIN_BUILDER_PROFILE "Emit compile time reports for each translation unit" OFF)
+if(PLUGIN_BUILDER_PROFILE)
+  if(CMAKE_CXX_COMPILER_ID MATCHES "Clang")
+    if(MSVC)
+      target_compile_options(__PLUGIN_NAME__ PRIVATE $<$<COMPILE_LANGUAGE:CXX>:/clang:-ftime-trace>)
+    else()
+      target_compile_options(__PLUGIN_NAME__ PRIVATE $<$<COMPILE_LANGUAGE:CXX>:-ftime-trace>)
+    endif()
+  elseif(CMAKE_CXX_COMPILER_ID STREQUAL "GNU")
+    target_compile_options(__PLUGIN_NAME__ PRIVATE $<$<COMPILE_LANGUAGE:CXX>:-ftime-report>)
+  elseif(MSVC)
+    target_compile_options(__PLUGIN_NAME__ PRIVATE "$<$<COMPILE_LANGUAGE:CXX>:/Bt+;/d1reportTime>")
+  endif()
+endif()
 '''
 
 cuda_block = '''
@@ -22,9 +22,11 @@ SOFTWARE.
 """
 
 import configparser
+import importlib
 import os
 import shutil
 import subprocess
+import sys
 import threading
 import queue
 import json
@@ -58,9 +60,21 @@ class PluginBuilderExt:
 		if self.config.has_section('DevMode'):
 			self.dev_mode = True
 
+		self.profile_builds = False
+		if self.config.has_section('Profiling'):
+			self.profile_builds = True
+		self.profiler = None
+
+		self.use_build_server = False
+		if self.config.has_section('BuildServer'):
+			self.use_build_server = True
+		self.build_client = None
+		self.build_server_watching = False
+
 		self.on_par_value_change_map = {
 			'Outputto': self.onOutputto,
 			'Pluginname': self.onPluginname,
+			'Compileonupdate': self.onCompileonupdate,
 		}
 
 		self.on_par_pulse_map = {
@@ -90,6 +104,9 @@ class PluginBuilderExt:
 		self.plugin_projects_dir = 'PluginProjects'
 		self.plugins_dir = 'Plugins'
 
+		self.registry = self.import_source_module('ProjectRegistry').ProjectRegistry(self.plugin_projects_dir)
+		self.registry.refresh()
+
 		self.process = None
 		self.queue = None
 		if self.start_subprocess():
@@ -120,6 +137,7 @@ class PluginBuilderExt:
 		config = self.ownerComp.par.Buildconfig.eval()
 
 		cmd = f'set PLUGINBUILDER_BUILD="" && cmake -B build -G Ninja -DPLUGIN_BUILDER_DIR={self.PluginBuilderDir} -DPLUGIN_DIR={self.plugin_dir} -DCMAKE_BUILD_TYPE={config}'
+		cmd += f" -DPLUGIN_BUILDER_PROFILE={'ON' if self.profile_builds else 'OFF'}"
 		return cmd
 	
 	@property
@@ -208,6 +226,23 @@ class PluginBuilderExt:
 	@property
 	def CompileOnUpdate(self):
 		return self.ownerComp.par.Compileonupdate.eval()
+
+	@property
+	def build_server_address(self):
+		BuildServer = self.import_source_module('BuildServer')
+		host = self.config.get('BuildServer', 'Host', fallback=BuildServer.DEFAULT_HOST)
+		port = self.config.getint('BuildServer', 'Port', fallback=BuildServer.DEFAULT_PORT)
+		return host, port
+
+	@property
+	def Profiler(self):
+		if not self.profile_builds:
+			return None
+
+		if self.profiler is None or self.profiler.working_dir != self.abs_working_dir:
+			top = self.config.getint('Profiling', 'Top', fallback=10)
+			self.profiler = self.import_source_module('BuildProfiler').BuildProfiler(self.abs_working_dir, top=top)
+		return self.profiler
 	
 
 	############## Internal Methods ###############################################################
@@ -215,6 +250,14 @@ class PluginBuilderExt:
 	def get_path(self, section, key):
 		return self.config.get(section, key).replace('${USER_PATH}', self.user_home)
 
+	def import_source_module(self, name):
+		"""Imports a module from PluginBuilderDir/source, which unlike CMakeBlocks is not a DAT in PluginBuilder.tox."""
+
+		source_dir = f"{self.PluginBuilderDir}/source"
+		if source_dir not in sys.path:
+			sys.path.append(source_dir)
+		return importlib.import_module(name)
+
 	def create_plugin(self):
 		"""Creates a new plugin project and configure builder."""
 
@@ -236,6 +279,7 @@ class PluginBuilderExt:
 			cmake_text = template_info.get('assemble_cmake')()
 			cmake_text = cmake_text.replace('__PLUGIN_NAME__', self.Pluginname)
 			cmake_text = cmake_text.replace('__PLUGIN_TYPE__', f"'{template_info.get('type')}'")
+			cmake_text = cmake_text.replace('__PLUGIN_TEMPLATE__', f"'{template_name}'")
 			cmake_text = cmake_text.replace('__PLUGIN_BUILDER_DIR__', f'"{self.PluginBuilderDir}"')
 
 			with open(f"{self.working_dir}/CMakeLists.txt", 'w') as f:
@@ -292,6 +336,7 @@ class PluginBuilderExt:
 			shutil.rmtree(self.working_dir)
 			raise e
 		
+		self.registry.update(self.Pluginname)
 		self.create_plugin_loader(template_info.get('type'))
 		run("args[0].PostCreatePlugin()", self.ownerComp, delayFrames=300)
 		if not self.dev_mode:
@@ -328,6 +373,38 @@ class PluginBuilderExt:
 
 		pass
 
+	def switch_plugin_loader(self, plugin_type):
+		"""Points the existing plugin loader at the current plugin, or creates a new one if the op type differs."""
+
+		loader_op = self.ownerComp.op('plugin_loader')
+		has_input_op = self.ownerComp.op('in1') is not None
+		if (loader_op is None or loader_op.family != plugin_type
+				or has_input_op != self.ownerComp.par.Createinputop.eval()):
+			self.create_plugin_loader(plugin_type)
+			loader_op = self.loader_op
+		else:
+			self.loader_op = loader_op
+			loader_op.par.unloadplugin = True
+			loader_op.cook(force=True)
+			loader_op.par.plugin = self.PluginPath
+
+		# load the last good build right away instead of waiting for a compile
+		if self.registry.last_good_artifact(self.Pluginname) == self.PluginPath:
+			loader_op.par.plugin = self.PluginPath
+			loader_op.par.unloadplugin = False
+
+	def switch_subprocess(self):
+		"""Moves the running build shell or build server subscription to the current plugin project."""
+
+		if self.build_client is not None:
+			if not self.connect_build_server():
+				self.fall_back_to_subprocess()
+		elif self.process is not None and self.process.poll() is None:
+			# keep the vcvarsall environment instead of starting a new shell
+			self.SendCommand(f'cd /d "{self.abs_working_dir}"')
+		else:
+			self.start_subprocess()
+
 	def assemble_cmake_text_basic(self):
 		cmake_text = CMakeBlocks.start_block + CMakeBlocks.project_block + CMakeBlocks.core_block
 		return cmake_text
@@ -347,14 +424,42 @@ class PluginBuilderExt:
 		if not os.path.exists(self.abs_working_dir):
 			raise FileNotFoundError(f"Directory {self.abs_working_dir} does not exist.")
 		
-		if self.CMakeListsExists:
+		if not self.CMakeListsExists:
+			return
+
+		if not self.submit_build_server_job('configure'):
 			self.SendCommand(self.cmake_build_cmd)
 
 	def compile_plugin(self):
 		# print(f"Compiling {self.Pluginname}...")
-		if self.CMakeListsExists:
+		if not self.CMakeListsExists:
+			return
+
+		# with a build server the profile is marked when it reports the build started
+		if not self.submit_build_server_job('build'):
+			self.mark_build_profile()
 			self.SendCommand(self.cmake_build_plugin_cmd)
 
+	def submit_build_server_job(self, kind):
+		"""Submits a job to the build server, returns False if the command has to run in the local subprocess."""
+
+		if self.build_client is None:
+			return False
+
+		try:
+			self.build_client.submit(self.abs_working_dir, kind, self.build_config, self.profile_builds)
+		except OSError:
+			self.fall_back_to_subprocess()
+			return False
+
+		return True
+
+	def mark_build_profile(self, log_offset=None, mark_time=None):
+		"""Marks the end of the ninja log so the next report only covers the coming build."""
+		profiler = self.Profiler
+		if profiler is not None and profiler.log_offset is None:
+			profiler.mark(log_offset, mark_time)
+
 	def BuildAndCompile(self):
 		self.build_plugin()
 		self.compile_plugin()
@@ -432,6 +537,21 @@ class PluginBuilderExt:
 		self.ownerComp.par.Plugintemplate.readOnly = False
 		self.ownerComp.par.Createinputop.enable = True
 
+	def ReportBuildProfile(self):
+		"""Prints a ranked compile time report of the last build and stores it in the history."""
+
+		profiler = self.Profiler
+		if profiler is None:
+			return
+
+		history = profiler.read_history()
+		previous = history[-1] if history else None
+		report = profiler.profile(self.build_config)
+		if not report['tus']:
+			return
+
+		print(profiler.format_report(report, previous))
+
 
 	############## Par Callbacks ##################################################################
 	
@@ -448,28 +568,26 @@ class PluginBuilderExt:
 		self.close_subprocess()
 		self.start_subprocess()
 
+	def onCompileonupdate(self, value, prev):
+		if self.build_client is None:
+			return
+		try:
+			self.update_build_server_watch(value)
+		except OSError:
+			self.fall_back_to_subprocess()
+
 	def onPluginname(self, value, prev):
 		if value == '':
 			self.clear_plugin_builder()
-		elif os.path.exists(self.CMakeListsPath):
-			with open(self.CMakeListsPath, 'r') as f:
-				first_line = f.readline()
-			if first_line.startswith('#'):
-				info = None
-				try:
-					info = eval(first_line[2:])
-				except:
-					pass
-				if info is not None:
-					plugin_type = info.get('plugin_type')
-					if plugin_type is not None:
-						print("Loading PluginProject:", f"{self.Pluginname}...", f"Type: {plugin_type}")
-						self.create_plugin_loader(plugin_type)
-						self.start_subprocess()
-						self.ownerComp.cook(force=True, recurse=True)
-						return
-
-			
+		else:
+			info = self.registry.update(self.Pluginname)
+			plugin_type = info.get('plugin_type') if info is not None else None
+			if plugin_type in self.loader_op_map:
+				print("Loading PluginProject:", f"{self.Pluginname}...", f"Type: {plugin_type}")
+				self.switch_plugin_loader(plugin_type)
+				self.switch_subprocess()
+				self.RefreshDats()
+				return
 
 		self.loader_op = self.ownerComp.op('plugin_loader')
 		if self.loader_op is not None:
@@ -487,6 +605,10 @@ class PluginBuilderExt:
 
 		if self.loader_op is None or self.Pluginname == '':
 			return
+
+		if self.build_client is not None:
+			# the build server copies the dll as the last step of its build job
+			return
 		
 		# print(f"Reloading {self.Pluginname}...")
 		
@@ -512,11 +634,45 @@ class PluginBuilderExt:
 
 		shutil.copyfile(build_path, plugin_path)
 
+		self.load_plugin(plugin_path)
+
+	def load_plugin(self, plugin_path):
+		"""Loads a freshly copied plugin dll in the unloaded plugin loader."""
+
 		if os.path.exists(plugin_path):
 			self.loader_op.par.plugin = plugin_path
 			self.loader_op.par.unloadplugin = False
+			self.registry.record_artifact(self.Pluginname, plugin_path)
+
+		if self.profile_builds:
+			# give the reader thread time to flush the compiler's timing output
+			run("args[0].ReportBuildProfile()", self.ownerComp, delayFrames=30)
+
+	def check_build_server_events(self):
+		"""Marks build profiles and reloads the plugin after the build server copied a new dll to the Plugins folder."""
+
+		if self.build_client is None:
+			return
+
+		artifact = None
+		while not self.build_client.events.empty():
+			event = self.build_client.events.get_nowait()
+			if event['event'] == 'started' and event['kind'] == 'build':
+				self.mark_build_profile(event['log_offset'], event['time'])
+			elif event['event'] == 'finished' and event.get('artifact'):
+				artifact = event['artifact']
+
+		if artifact is None or self.loader_op is None or self.Pluginname == '':
+			return
+
+		self.loader_op.par.unloadplugin = True
+		self.loader_op.cook(force=True)
+		self.load_plugin(self.PluginPath)
 
 	def OnSourceUpdate(self):
+		if self.build_server_watching:
+			# the build server watches the source folder itself
+			return
 		self.compile_plugin()
 
 
@@ -527,6 +683,7 @@ class PluginBuilderExt:
 			print(f"File {self.CMakeListsPath} does not exist.")
 			return
 
+		self.registry.update(self.Pluginname)
 		self.build_plugin()
 
 		
@@ -538,6 +695,9 @@ class PluginBuilderExt:
 		# check if directory exists
 		if not os.path.exists(self.abs_working_dir):
 			return False
+
+		if self.use_build_server and self.connect_build_server():
+			return True
   
 		mode = self.ownerComp.par.Outputto.eval()
 		cmd = self.start_subprocess_base_cmd
@@ -569,6 +729,56 @@ class PluginBuilderExt:
 
 		return self.process.returncode is None
 
+	def connect_build_server(self):
+		"""Connects to the shared build server and subscribes to this plugin project."""
+
+		self.close_build_client()
+
+		host, port = self.build_server_address
+		token = self.config.get('BuildServer', 'Token', fallback='')
+		self.queue = queue.Queue()
+		try:
+			self.build_client = self.import_source_module('BuildServer').BuildClient(token, host, port, self.queue)
+			self.build_client.subscribe(self.abs_working_dir)
+			self.update_build_server_watch(self.CompileOnUpdate)
+		except OSError:
+			print(f"Build server not reachable at {host}:{port}, using a local subprocess.")
+			self.close_build_client()
+			return False
+
+		return True
+
+	def update_build_server_watch(self, watch):
+		"""Lets the build server compile on source changes while Compile On Update is on."""
+
+		if watch:
+			self.build_client.watch(self.abs_working_dir, self.build_config, self.profile_builds)
+		elif self.build_server_watching:
+			self.build_client.unwatch(self.abs_working_dir)
+		self.build_server_watching = bool(watch)
+
+	def fall_back_to_subprocess(self):
+		"""Replaces a build server connection that was closed, e.g. by a refused token or a server restart, with a local subprocess."""
+
+		print("Lost the connection to the build server, using a local subprocess.")
+		self.close_build_client()
+		self.use_build_server = False
+		return self.start_subprocess()
+
+	def check_build_server_connection(self):
+		if self.build_client is None or not self.build_client.disconnected.is_set():
+			return
+
+		# jobs sent to the server may have been lost with the connection
+		if self.fall_back_to_subprocess():
+			self.build_plugin()
+
+	def close_build_client(self):
+		if self.build_client is not None:
+			self.build_client.close()
+			self.build_client = None
+		self.build_server_watching = False
+
 	def _output_reader(self):
 		"""Reads output from the subprocess and stores it in a queue."""
 		for line in self.process.stdout:
@@ -584,9 +794,11 @@ class PluginBuilderExt:
 			raise Exception("Subprocess is not running.")
 
 	def CheckAndPrintOutput(self):
-		if self.queue is None or self.queue.empty():
-			return
-		self.PrintOutput()
+		self.check_build_server_events()
+		if self.queue is not None and not self.queue.empty():
+			self.PrintOutput()
+		# after printing, so the server's last error is shown before falling back
+		self.check_build_server_connection()
 
 	def GetOutput(self):
 		"""Retrieves available output from the queue."""
@@ -597,11 +809,16 @@ class PluginBuilderExt:
 	
 	def PrintOutput(self):
 		output_lines = self.GetOutput()
+		profiler = self.Profiler
 
 		for line in output_lines:
+			if profiler is not None:
+				profiler.collect_output(line)
 			print(line, end='')
 
 	def close_subprocess(self):
+
+		self.close_build_client()
 		
 		if self.process is not None:
 
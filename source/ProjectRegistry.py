@@ -0,0 +1,207 @@
+"""MIT License
+
+Copyright (c) 2024 Keith Lostracco
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import ast
+import hashlib
+import json
+import os
+
+REGISTRY_FILE = 'registry.json'
+
+# CMakeCache.txt entries recorded as the build options of a project
+BUILD_OPTIONS = ('CMAKE_BUILD_TYPE', 'PLUGIN_BUILDER_PROFILE')
+
+
+class ProjectRegistry:
+	"""
+	Persistent index of the plugin projects in a PluginProjects folder.
+
+	Each entry holds the plugin type and template from the CMakeLists.txt
+	header, the build options from CMakeCache.txt and the last good artifact
+	with its hash. Files are only parsed again when their size or
+	modification time changed.
+
+	"""
+	def __init__(self, plugin_projects_dir):
+		self.plugin_projects_dir = plugin_projects_dir
+		self.projects = {}
+		self.load()
+
+	############## Properties #####################################################################
+
+	@property
+	def path(self):
+		return f"{self.plugin_projects_dir}/{REGISTRY_FILE}"
+
+	############## Persistence ####################################################################
+
+	def load(self):
+		if not os.path.exists(self.path):
+			return
+
+		try:
+			with open(self.path, 'r') as f:
+				self.projects = json.load(f)
+		except (OSError, ValueError):
+			print(f"Could not read {self.path}, rebuilding plugin project registry.")
+			self.projects = {}
+
+	def save(self):
+		if not os.path.exists(self.plugin_projects_dir):
+			return
+
+		tmp_path = f"{self.path}.tmp"
+		with open(tmp_path, 'w') as f:
+			json.dump(self.projects, f, indent=4)
+		os.replace(tmp_path, self.path)
+
+	############## Parsing ########################################################################
+
+	def file_stamp(self, path):
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return [stat.st_size, stat.st_mtime_ns]
+
+	def parse_header(self, path):
+		"""Reads the {'plugin_type': ...} dict from the first line of a CMakeLists.txt."""
+
+		with open(path, 'r') as f:
+			first_line = f.readline()
+
+		if not first_line.startswith('#'):
+			return {}
+
+		try:
+			info = ast.literal_eval(first_line[1:].strip())
+		except (ValueError, SyntaxError):
+			return {}
+
+		return info if isinstance(info, dict) else {}
+
+	def parse_build_options(self, path):
+		"""Reads the recorded build options from a CMakeCache.txt."""
+
+		options = {}
+		with open(path, 'r') as f:
+			for line in f:
+				key, sep, value = line.partition('=')
+				if not sep:
+					continue
+				key = key.split(':')[0]
+				if key in BUILD_OPTIONS:
+					options[key] = value.strip()
+		return options
+
+	############## Entries ########################################################################
+
+	def update(self, name, save=True):
+		"""Updates the entry of a plugin project from its files and returns it, None if it does not exist."""
+
+		cmake_path = f"{self.plugin_projects_dir}/{name}/CMakeLists.txt"
+		cmake_stamp = self.file_stamp(cmake_path)
+		if cmake_stamp is None:
+			if self.projects.pop(name, None) is not None and save:
+				self.save()
+			return None
+
+		entry = self.projects.setdefault(name, {})
+		changed = False
+
+		if entry.get('cmake_stamp') != cmake_stamp:
+			header = self.parse_header(cmake_path)
+			entry['plugin_type'] = header.get('plugin_type')
+			entry['template'] = header.get('template')
+			entry['cmake_stamp'] = cmake_stamp
+			changed = True
+
+		cache_path = f"{self.plugin_projects_dir}/{name}/build/CMakeCache.txt"
+		cache_stamp = self.file_stamp(cache_path)
+		if 'cache_stamp' not in entry or entry['cache_stamp'] != cache_stamp:
+			entry['build_options'] = self.parse_build_options(cache_path) if cache_stamp else {}
+			entry['cache_stamp'] = cache_stamp
+			changed = True
+
+		if changed and save:
+			self.save()
+
+		return entry
+
+	def refresh(self):
+		"""Updates all entries, adding new plugin projects and dropping deleted ones."""
+
+		if not os.path.exists(self.plugin_projects_dir):
+			return
+
+		names = [name for name in os.listdir(self.plugin_projects_dir)
+				 if os.path.isdir(f"{self.plugin_projects_dir}/{name}")]
+
+		for name in list(self.projects):
+			if name not in names:
+				del self.projects[name]
+
+		for name in names:
+			self.update(name, save=False)
+
+		self.save()
+
+	def record_artifact(self, name, artifact_path):
+		"""Records a plugin dll that built and loaded successfully."""
+
+		entry = self.update(name, save=False)
+		if entry is None or not os.path.exists(artifact_path):
+			return
+
+		entry['artifact'] = {
+			'path': artifact_path,
+			'hash': self.file_hash(artifact_path),
+			'stamp': self.file_stamp(artifact_path),
+		}
+		self.save()
+
+	def file_hash(self, path):
+		sha = hashlib.sha256()
+		with open(path, 'rb') as f:
+			for chunk in iter(lambda: f.read(1 << 20), b''):
+				sha.update(chunk)
+		return sha.hexdigest()
+
+	def last_good_artifact(self, name):
+		"""Returns the recorded artifact path if its contents are still the ones that loaded."""
+
+		artifact = self.projects.get(name, {}).get('artifact')
+		if artifact is None:
+			return None
+
+		# the stamp rules out most changes without reading the dll
+		if self.file_stamp(artifact['path']) != artifact['stamp']:
+			return None
+
+		try:
+			if self.file_hash(artifact['path']) != artifact['hash']:
+				return None
+		except OSError:
+			return None
+
+		return artifact['path']
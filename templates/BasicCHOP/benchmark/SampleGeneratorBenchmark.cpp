@@ -0,0 +1,174 @@
+// Compares SampleGenerator against the scalar per sample loop it replaces.
+//
+// The first table generates one large block per call, followed by a check of
+// two threads cooking through the shared pool at once. The second table mimics
+// a timesliced CHOP cooking every frame, where the number of samples changes
+// from cook to cook, and starts from a new SampleGenerator so filling its
+// phase tables is part of the measured time.
+//
+// Usage: SampleGeneratorBenchmark [channels] [samples] [iterations] [cooks]
+
+#include "SampleGenerator.h"
+#include "ThreadPool.h"
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <functional>
+#include <memory>
+#include <thread>
+#include <vector>
+
+namespace
+{
+
+struct Buffer
+{
+	Buffer(int32_t numChannels, int32_t numSamples) :
+		data(size_t(numChannels) * numSamples),
+		channels(numChannels)
+	{
+		for (int32_t i = 0; i < numChannels; i++)
+			channels[i] = data.data() + size_t(i) * numSamples;
+	}
+
+	std::vector<float>	data;
+	std::vector<float*>	channels;
+};
+
+// Returns the best time of one call in milliseconds.
+double
+timeIt(int iterations, const std::function<void()>& fn)
+{
+	fn();	// warm up, also fills the phase tables
+
+	double best = 1e30;
+	for (int i = 0; i < iterations; i++)
+	{
+		auto start = std::chrono::steady_clock::now();
+		fn();
+		auto end = std::chrono::steady_clock::now();
+		best = std::min(best, std::chrono::duration<double, std::milli>(end - start).count());
+	}
+	return best;
+}
+
+float
+maxError(const Buffer& a, const Buffer& b)
+{
+	float error = 0.0f;
+	for (size_t i = 0; i < a.data.size(); i++)
+		error = std::max(error, std::fabs(a.data[i] - b.data[i]));
+	return error;
+}
+
+}
+
+int
+main(int argc, char* argv[])
+{
+	int32_t numChannels = argc > 1 ? atoi(argv[1]) : 32;
+	int32_t numSamples = argc > 2 ? atoi(argv[2]) : 100000;
+	int iterations = argc > 3 ? atoi(argv[3]) : 20;
+	int cooks = argc > 4 ? atoi(argv[4]) : 1000000;
+
+	const double offset = 12.345;
+	const double phase = 2.0 * 3.14159 / numChannels;
+	const double step = 0.01;
+	const double scale = 1.0;
+
+	Buffer scalar(numChannels, numSamples);
+	Buffer batched(numChannels, numSamples);
+	Buffer parallel(numChannels, numSamples);
+
+	SampleGenerator generator;
+	std::shared_ptr<ThreadPool> pool = ThreadPool::shared();
+
+	printf("%d channels x %d samples, best of %d, %d threads\n\n",
+		numChannels, numSamples, iterations, pool->numThreads());
+	printf("%-8s %12s %12s %12s %10s %10s\n", "shape", "scalar ms", "batched ms", "parallel ms", "speedup", "max error");
+
+	const char* names[] = { "sine", "square", "ramp" };
+	for (int s = 0; s < 3; s++)
+	{
+		WaveShape shape = WaveShape(s);
+
+		double scalarMs = timeIt(iterations, [&] {
+			SampleGenerator::generateScalar(scalar.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale);
+		});
+		double batchedMs = timeIt(iterations, [&] {
+			generator.generate(batched.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale);
+		});
+		double parallelMs = timeIt(iterations, [&] {
+			generator.generate(parallel.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale, pool.get());
+		});
+
+		float error = std::max(maxError(scalar, batched), maxError(scalar, parallel));
+
+		printf("%-8s %12.3f %12.3f %12.3f %9.1fx %10.2g\n",
+			names[s], scalarMs, batchedMs, parallelMs, scalarMs / std::min(batchedMs, parallelMs), error);
+	}
+
+	// Two nodes cooking on different threads take turns on the shared pool
+	{
+		WaveShape shape = WaveShape::Sine;
+		Buffer first(numChannels, numSamples);
+		Buffer second(numChannels, numSamples);
+		SampleGenerator firstGenerator;
+		SampleGenerator secondGenerator;
+
+		SampleGenerator::generateScalar(scalar.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale);
+
+		std::thread other([&]
+		{
+			for (int i = 0; i < iterations; i++)
+				secondGenerator.generate(second.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale, pool.get());
+		});
+		for (int i = 0; i < iterations; i++)
+			firstGenerator.generate(first.channels.data(), numChannels, numSamples, shape, offset, phase, step, scale, pool.get());
+		other.join();
+
+		printf("\n2 threads sharing the pool, max error %.2g\n",
+			std::max(maxError(scalar, first), maxError(scalar, second)));
+	}
+
+	// Timesliced cooks of 1 to 3 samples, as at 120 samples per second on a 60 fps timeline
+	const int32_t sliceChannels = 4;
+	const int32_t maxSlice = 3;
+	Buffer slice(sliceChannels, maxSlice);
+
+	printf("\n%d cooks of %d channels x 1-%d samples\n\n", cooks, sliceChannels, maxSlice);
+	printf("%-8s %12s %12s %10s\n", "shape", "scalar ms", "batched ms", "speedup");
+
+	for (int s = 0; s < 3; s++)
+	{
+		WaveShape shape = WaveShape(s);
+
+		auto runCooks = [&](SampleGenerator* sliceGenerator)
+		{
+			double sliceOffset = offset;
+			auto start = std::chrono::steady_clock::now();
+			for (int i = 0; i < cooks; i++)
+			{
+				int32_t numSlice = 1 + i % maxSlice;
+				if (sliceGenerator)
+					sliceGenerator->generate(slice.channels.data(), sliceChannels, numSlice, shape, sliceOffset, phase, step, scale);
+				else
+					SampleGenerator::generateScalar(slice.channels.data(), sliceChannels, numSlice, shape, sliceOffset, phase, step, scale);
+				sliceOffset += step * numSlice;
+			}
+			auto end = std::chrono::steady_clock::now();
+			return std::chrono::duration<double, std::milli>(end - start).count();
+		};
+
+		SampleGenerator sliceGenerator;
+		double scalarMs = runCooks(nullptr);
+		double batchedMs = runCooks(&sliceGenerator);
+
+		printf("%-8s %12.3f %12.3f %9.1fx\n", names[s], scalarMs, batchedMs, scalarMs / batchedMs);
+	}
+
+	return 0;
+}
@@ -114,7 +114,7 @@ BasicCHOP::getOutputInfo(CHOP_OutputInfo* info, const OP_Inputs* inputs, void* r
 	}
 	else
 	{
-		info->numChannels = 1;
+		info->numChannels = inputs->getParInt("Channels");
 
 		// Since we are outputting a timeslice, the system will dictate
 		// the numSamples and startIndex of the BasicCHOP data
@@ -130,7 +130,13 @@ BasicCHOP::getOutputInfo(CHOP_OutputInfo* info, const OP_Inputs* inputs, void* r
 void
 BasicCHOP::getChannelName(int32_t index, OP_String *name, const OP_Inputs* inputs, void* reserved1)
 {
-	name->setString("chan1");
+	char tempBuffer[32];
+#ifdef _WIN32
+	sprintf_s(tempBuffer, "chan%d", index + 1);
+#else // macOS
+	snprintf(tempBuffer, sizeof(tempBuffer), "chan%d", index + 1);
+#endif
+	name->setString(tempBuffer);
 }
 
 void
@@ -152,6 +158,7 @@ BasicCHOP::execute(CHOP_Output* output,
 		inputs->enablePar("Speed", 0);	// not used
 		inputs->enablePar("Reset", 0);	// not used
 		inputs->enablePar("Shape", 0);	// not used
+		inputs->enablePar("Channels", 0);	// not used
 
 		int ind = 0;
 		const OP_CHOPInput	*cinput = inputs->getInputCHOP(0);
@@ -173,6 +180,7 @@ BasicCHOP::execute(CHOP_Output* output,
 	{
 		inputs->enablePar("Speed", 1);
 		inputs->enablePar("Reset", 1);
+		inputs->enablePar("Channels", 1);
 
 		double speed = inputs->getParDouble("Speed");
 		double step = speed * 0.01f;
@@ -191,37 +199,13 @@ BasicCHOP::execute(CHOP_Output* output,
 		// outputing 2 samples (assuming the timeline is running at 60hz).
 
 
-		for (int i = 0; i < output->numChannels; i++)
-		{
-			double offset = myOffset + phase*i;
-
-
-			double v = 0.0f;
-
-			switch(shape)
-			{
-				case 0:		// sine
-					v = sin(offset);
-					break;
-
-				case 1:		// square
-					v = fabs(fmod(offset, 1.0)) > 0.5;
-					break;
-
-				case 2:		// ramp	
-					v = fabs(fmod(offset, 1.0));
-					break;
-			}
-
-
-			v *= scale;
+		// Each channel is written as one contiguous block from precomputed phase
+		// tables, large outputs are split across the shared thread pool by channel.
+		if (!myThreadPool && SampleGenerator::shouldParallelize(output->numChannels, output->numSamples))
+			myThreadPool = ThreadPool::shared();
 
-			for (int j = 0; j < output->numSamples; j++)
-			{
-				output->channels[i][j] = float(v);
-				offset += step;
-			}
-		}
+		myGenerator.generate(output->channels, output->numChannels, output->numSamples,
+							WaveShape(shape), myOffset, phase, step, scale, myThreadPool.get());
 
 		myOffset += step * output->numSamples; 
 	}
@@ -359,6 +343,22 @@ BasicCHOP::setupParameters(OP_ParameterManager* manager, void *reserved1)
 		assert(res == OP_ParAppendResult::Success);
 	}
 
+	// channels
+	{
+		OP_NumericParameter	np;
+
+		np.name = "Channels";
+		np.label = "Channels";
+		np.defaultValues[0] = 1;
+		np.minValues[0] = 1;
+		np.clampMins[0] = true;
+		np.minSliders[0] = 1;
+		np.maxSliders[0] = 64;
+
+		OP_ParAppendResult res = manager->appendInt(np);
+		assert(res == OP_ParAppendResult::Success);
+	}
+
 	// shape
 	{
 		OP_StringParameter	sp;
@@ -13,6 +13,10 @@
 */
 
 #include "CHOP_CPlusPlusBase.h"
+#include "SampleGenerator.h"
+#include "ThreadPool.h"
+
+#include <memory>
 
 using namespace TD;
 
@@ -29,6 +33,7 @@ will look wierd since depending on the timeslice size some number of the first s
 of the input will get used.
 
 If no input is connected then the node will output a smooth sine wave at 120hz.
+The samples are generated by SampleGenerator, see SampleGenerator.h.
 */
 
 
@@ -77,5 +82,11 @@ private:
 
 	double				myOffset;
 
+	// Keeps the phase tables between cooks.
+	SampleGenerator		myGenerator;
+
+	// The pool shared by all BasicCHOPs, only taken once the output is large
+	// enough to be split across threads.
+	std::shared_ptr<ThreadPool>	myThreadPool;
 
 };
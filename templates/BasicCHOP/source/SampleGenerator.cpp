@@ -0,0 +1,139 @@
+#include "SampleGenerator.h"
+#include "ThreadPool.h"
+
+#include <cmath>
+
+bool
+SampleGenerator::shouldParallelize(int32_t numChannels, int32_t numSamples)
+{
+	return numChannels > 1 && int64_t(numChannels) * numSamples >= ParallelThreshold;
+}
+
+void
+SampleGenerator::generate(float* const* channels, int32_t numChannels, int32_t numSamples,
+						WaveShape shape, double offset, double phase, double step, double scale,
+						ThreadPool* pool)
+{
+	if (numChannels <= 0 || numSamples <= 0)
+		return;
+
+	updateTables(numSamples, step);
+
+	if (pool && shouldParallelize(numChannels, numSamples))
+	{
+		pool->parallelFor(numChannels, [&](int32_t i)
+		{
+			generateChannel(channels[i], numSamples, shape, offset + phase * i, scale);
+		});
+	}
+	else
+	{
+		for (int32_t i = 0; i < numChannels; i++)
+			generateChannel(channels[i], numSamples, shape, offset + phase * i, scale);
+	}
+}
+
+void
+SampleGenerator::generateScalar(float* const* channels, int32_t numChannels, int32_t numSamples,
+						WaveShape shape, double offset, double phase, double step, double scale)
+{
+	for (int32_t i = 0; i < numChannels; i++)
+	{
+		double x = offset + phase * i;
+
+		for (int32_t j = 0; j < numSamples; j++)
+		{
+			double v = 0.0;
+
+			switch (shape)
+			{
+				case WaveShape::Sine:
+					v = sin(x);
+					break;
+
+				case WaveShape::Square:
+					v = fabs(fmod(x, 1.0)) > 0.5;
+					break;
+
+				case WaveShape::Ramp:
+					v = fabs(fmod(x, 1.0));
+					break;
+			}
+
+			channels[i][j] = float(v * scale);
+			x += step;
+		}
+	}
+}
+
+void
+SampleGenerator::updateTables(int32_t numSamples, double step)
+{
+	// Entries only depend on j and step, so the tables are kept at the largest
+	// timeslice seen and only the new entries are filled when they grow.
+	if (myTableStep != step)
+	{
+		myRamp.clear();
+		mySin.clear();
+		myCos.clear();
+		myTableStep = step;
+	}
+
+	int32_t first = (int32_t)myRamp.size();
+	if (first >= numSamples)
+		return;
+
+	myRamp.resize(numSamples);
+	mySin.resize(numSamples);
+	myCos.resize(numSamples);
+
+	for (int32_t j = first; j < numSamples; j++)
+	{
+		myRamp[j] = step * j;
+		mySin[j] = sin(myRamp[j]);
+		myCos[j] = cos(myRamp[j]);
+	}
+}
+
+void
+SampleGenerator::generateChannel(float* out, int32_t numSamples, WaveShape shape,
+						double offset, double scale) const
+{
+	const double* ramp = myRamp.data();
+
+	switch (shape)
+	{
+		case WaveShape::Sine:
+		{
+			const double* sinTable = mySin.data();
+			const double* cosTable = myCos.data();
+			const double s = sin(offset) * scale;
+			const double c = cos(offset) * scale;
+
+			for (int32_t j = 0; j < numSamples; j++)
+				out[j] = float(s * cosTable[j] + c * sinTable[j]);
+			break;
+		}
+
+		case WaveShape::Square:
+		{
+			for (int32_t j = 0; j < numSamples; j++)
+			{
+				double x = offset + ramp[j];
+				double f = fabs(x - trunc(x));
+				out[j] = float(f > 0.5 ? scale : 0.0);
+			}
+			break;
+		}
+
+		case WaveShape::Ramp:
+		{
+			for (int32_t j = 0; j < numSamples; j++)
+			{
+				double x = offset + ramp[j];
+				out[j] = float(fabs(x - trunc(x)) * scale);
+			}
+			break;
+		}
+	}
+}
@@ -0,0 +1,58 @@
+#pragma once
+
+#include <cstdint>
+#include <vector>
+
+class ThreadPool;
+
+/*
+
+Generates the sine, square and ramp waves of the example CHOP.
+
+Each channel is written as one contiguous block. The per sample offsets
+j * step, and their sine and cosine, are kept in tables sized to the largest
+number of samples seen and only rebuilt when the step changes, so between
+cooks, even when a timeslice has a different length every frame, the inner
+loops are plain multiply-adds over arrays that the compiler can vectorize:
+
+	sin(offset + j * step) = sin(offset) * cos(j * step) + cos(offset) * sin(j * step)
+
+Large outputs with several channels are split across a ThreadPool, one
+channel per task.
+
+*/
+
+enum class WaveShape
+{
+	Sine = 0,
+	Square,
+	Ramp
+};
+
+class SampleGenerator
+{
+public:
+	// Below this many samples in total the output is generated on the calling thread.
+	static const int64_t	ParallelThreshold = 1 << 15;
+
+	static bool		shouldParallelize(int32_t numChannels, int32_t numSamples);
+
+	// Fills channels[i][j] with the shape at offset + phase * i + step * j, times scale.
+	void			generate(float* const* channels, int32_t numChannels, int32_t numSamples,
+							WaveShape shape, double offset, double phase, double step, double scale,
+							ThreadPool* pool = nullptr);
+
+	// Reference implementation calling the math functions once per sample.
+	static void		generateScalar(float* const* channels, int32_t numChannels, int32_t numSamples,
+							WaveShape shape, double offset, double phase, double step, double scale);
+
+private:
+	void			updateTables(int32_t numSamples, double step);
+	void			generateChannel(float* out, int32_t numSamples, WaveShape shape,
+							double offset, double scale) const;
+
+	std::vector<double>	myRamp;
+	std::vector<double>	mySin;
+	std::vector<double>	myCos;
+	double				myTableStep = 0.0;
+};
@@ -0,0 +1,120 @@
+#include "ThreadPool.h"
+
+ThreadPool::ThreadPool(unsigned int numThreads) :
+	myTask(nullptr),
+	myCount(0),
+	myNext(0),
+	myBusyWorkers(0),
+	myGeneration(0),
+	myStop(false)
+{
+	if (numThreads == 0)
+	{
+		unsigned int hardware = std::thread::hardware_concurrency();
+		numThreads = hardware > 1 ? hardware - 1 : 0;
+	}
+
+	for (unsigned int i = 0; i < numThreads; i++)
+		myWorkers.emplace_back(&ThreadPool::workerLoop, this);
+}
+
+ThreadPool::~ThreadPool()
+{
+	{
+		std::lock_guard<std::mutex> lock(myMutex);
+		myStop = true;
+	}
+	myWake.notify_all();
+
+	for (std::thread& worker : myWorkers)
+		worker.join();
+}
+
+std::shared_ptr<ThreadPool>
+ThreadPool::shared()
+{
+	static std::mutex				sharedMutex;
+	static std::weak_ptr<ThreadPool>	sharedPool;
+
+	std::lock_guard<std::mutex> lock(sharedMutex);
+
+	std::shared_ptr<ThreadPool> pool = sharedPool.lock();
+	if (!pool)
+	{
+		pool = std::make_shared<ThreadPool>();
+		sharedPool = pool;
+	}
+	return pool;
+}
+
+int
+ThreadPool::numThreads() const
+{
+	return (int)myWorkers.size() + 1;
+}
+
+void
+ThreadPool::parallelFor(int32_t count, const std::function<void(int32_t)>& fn)
+{
+	if (count <= 0)
+		return;
+
+	if (myWorkers.empty() || count == 1)
+	{
+		for (int32_t i = 0; i < count; i++)
+			fn(i);
+		return;
+	}
+
+	std::lock_guard<std::mutex> call(myCallMutex);
+
+	{
+		std::lock_guard<std::mutex> lock(myMutex);
+		myTask = &fn;
+		myCount = count;
+		myNext = 0;
+		myBusyWorkers = (int)myWorkers.size();
+		myGeneration++;
+	}
+	myWake.notify_all();
+
+	runTasks();
+
+	// Wait for the workers to finish their last index before fn goes out of scope
+	std::unique_lock<std::mutex> lock(myMutex);
+	myDone.wait(lock, [this] { return myBusyWorkers == 0; });
+	myTask = nullptr;
+}
+
+void
+ThreadPool::workerLoop()
+{
+	uint64_t seenGeneration = 0;
+
+	while (true)
+	{
+		{
+			std::unique_lock<std::mutex> lock(myMutex);
+			myWake.wait(lock, [&] { return myStop || myGeneration != seenGeneration; });
+			if (myStop)
+				return;
+			seenGeneration = myGeneration;
+		}
+
+		runTasks();
+
+		{
+			std::lock_guard<std::mutex> lock(myMutex);
+			myBusyWorkers--;
+		}
+		myDone.notify_one();
+	}
+}
+
+void
+ThreadPool::runTasks()
+{
+	int32_t i;
+	while ((i = myNext.fetch_add(1)) < myCount)
+		(*myTask)(i);
+}
@@ -0,0 +1,62 @@
+#pragma once
+
+#include <atomic>
+#include <condition_variable>
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+/*
+
+A small pool of worker threads that is created once and reused between cooks.
+parallelFor() hands out indices to the workers and the calling thread, and
+returns once every index has been processed. shared() returns one pool for all
+nodes of the plugin, so calls from several threads are run one after another.
+fn must not call parallelFor() on the same pool.
+
+*/
+
+class ThreadPool
+{
+public:
+	// 0 uses one thread less than the hardware provides, as the calling
+	// thread also does work.
+	explicit ThreadPool(unsigned int numThreads = 0);
+	~ThreadPool();
+
+	ThreadPool(const ThreadPool&) = delete;
+	ThreadPool& operator=(const ThreadPool&) = delete;
+
+	// The pool of all nodes, created by the first call. It is destroyed with the
+	// last node holding it instead of when the dll is unloaded, where joining
+	// the workers could deadlock on Windows.
+	static std::shared_ptr<ThreadPool>	shared();
+
+	int			numThreads() const;
+
+	// Calls fn(i) for every i in [0, count).
+	void		parallelFor(int32_t count, const std::function<void(int32_t)>& fn);
+
+private:
+	void		workerLoop();
+	void		runTasks();
+
+	std::vector<std::thread>	myWorkers;
+
+	// Held for a whole parallelFor() so callers on different threads take turns.
+	std::mutex					myCallMutex;
+
+	std::mutex					myMutex;
+	std::condition_variable		myWake;
+	std::condition_variable		myDone;
+
+	const std::function<void(int32_t)>*	myTask;
+	int32_t						myCount;
+	std::atomic<int32_t>		myNext;
+	int							myBusyWorkers;
+	uint64_t					myGeneration;
+	bool						myStop;
+};
@@ -0,0 +1,34 @@
+"""Stand-in for cmake and ninja used by the build server tests.
+
+	python stand_in_tool.py cmake -B build ... -DCMAKE_BUILD_TYPE=Release
+	python stand_in_tool.py ninja -C build
+
+Both sleep for STAND_IN_SLEEP seconds. cmake remembers the build config,
+ninja writes build/bin/<config>/<name>.dll where name is the project folder.
+"""
+
+import os
+import sys
+import time
+
+tool, args = sys.argv[1], sys.argv[2:]
+name = os.path.basename(os.getcwd())
+config_path = os.path.join('build', 'stand_in_config')
+
+print(f"{tool} {name} {' '.join(args)}", flush=True)
+time.sleep(float(os.environ.get('STAND_IN_SLEEP', '0')))
+
+if tool == 'cmake':
+	config = next(arg.split('=', 1)[1] for arg in args if arg.startswith('-DCMAKE_BUILD_TYPE='))
+	os.makedirs('build', exist_ok=True)
+	with open(config_path, 'w') as f:
+		f.write(config)
+elif tool == 'ninja':
+	with open(config_path, 'r') as f:
+		config = f.read()
+	bin_dir = os.path.join('build', 'bin', config)
+	os.makedirs(bin_dir, exist_ok=True)
+	with open(os.path.join(bin_dir, f"{name}.dll"), 'w') as f:
+		f.write(f"{name} {time.time()}")
+
+print(f"{tool} {name} done", flush=True)
@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source'))
+
+from BuildProfiler import BuildProfiler
+
+
+def ninja_log_line(start, end, output):
+	return f"{start}\t{end}\t0\t{output}\t0123456789abcdef\n"
+
+
+def trace_event(name, ts, dur, detail='', tid=0):
+	return {'ph': 'X', 'name': name, 'ts': ts, 'dur': dur, 'tid': tid, 'args': {'detail': detail}}
+
+
+class ReadNinjaLogTest(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.profiler = BuildProfiler(self.tmp.name)
+		os.makedirs(self.profiler.build_dir)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def write_log(self, lines, mode='w'):
+		with open(self.profiler.ninja_log_path, mode) as f:
+			if mode == 'w':
+				f.write('# ninja log v5\n')
+			f.writelines(lines)
+
+	def touch_output(self, output, mtime):
+		path = os.path.join(self.profiler.build_dir, output)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, 'w'):
+			pass
+		os.utime(path, (mtime, mtime))
+
+	def test_only_reads_steps_logged_after_the_mark(self):
+		self.write_log([ninja_log_line(0, 3000, 'CMakeFiles/P.dir/source/A.cpp.obj'),
+						ninja_log_line(0, 2000, 'CMakeFiles/P.dir/source/B.cpp.obj')])
+		self.profiler.mark()
+		self.write_log([ninja_log_line(0, 1500, 'CMakeFiles/P.dir/source/B.cpp.obj')], mode='a')
+
+		self.assertEqual(self.profiler.read_ninja_log(), {'CMakeFiles/P.dir/source/B.cpp.obj': 1500})
+
+	def test_reads_nothing_without_a_mark(self):
+		self.write_log([ninja_log_line(0, 3000, 'CMakeFiles/P.dir/source/A.cpp.obj')])
+
+		self.assertEqual(self.profiler.read_ninja_log(), {})
+
+	def test_uses_output_mtimes_after_recompaction(self):
+		old = 'CMakeFiles/P.dir/source/A.cpp.obj'
+		new = 'CMakeFiles/P.dir/source/B.cpp.obj'
+		self.write_log([ninja_log_line(0, 3000, old), ninja_log_line(0, 2000, new)] * 20)
+		self.profiler.mark()
+
+		# ninja rewrote a shorter log with one entry per output in any order
+		self.write_log([ninja_log_line(0, 1500, new), ninja_log_line(0, 3000, old)])
+		self.touch_output(old, self.profiler.mark_time - 60)
+		self.touch_output(new, self.profiler.mark_time + 1)
+
+		self.assertEqual(self.profiler.read_ninja_log(), {new: 1500})
+
+	def test_skips_steps_that_are_not_translation_units(self):
+		self.profiler.mark()
+		self.write_log([ninja_log_line(0, 1000, 'CMakeFiles/P.dir/source/A.cpp.obj'),
+						ninja_log_line(0, 500, 'CMakeFiles/P.dir/source/C.c.o'),
+						ninja_log_line(0, 800, 'bin/Release/P.dll'),
+						ninja_log_line(0, 10, 'build.ninja')])
+
+		self.assertEqual(self.profiler.read_ninja_log(), {'CMakeFiles/P.dir/source/A.cpp.obj': 1000,
+														  'CMakeFiles/P.dir/source/C.c.o': 500})
+
+	def test_mark_accepts_offset_and_time_from_a_build_server(self):
+		self.write_log([ninja_log_line(0, 3000, 'CMakeFiles/P.dir/source/A.cpp.obj')])
+		offset = os.path.getsize(self.profiler.ninja_log_path)
+		self.write_log([ninja_log_line(0, 1500, 'CMakeFiles/P.dir/source/B.cpp.obj')], mode='a')
+
+		self.profiler.mark(offset, time.time() - 10)
+
+		self.assertEqual(self.profiler.read_ninja_log(), {'CMakeFiles/P.dir/source/B.cpp.obj': 1500})
+
+
+class CompilerOutputTest(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.profiler = BuildProfiler(self.tmp.name)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def test_self_times_remove_nested_source_spans(self):
+		events = [
+			trace_event('Source', 0, 100000, 'outer.h'),
+			trace_event('Source', 10000, 60000, 'inner.h'),
+			trace_event('Source', 15000, 50000, 'deep.h'),
+			trace_event('Source', 0, 20000, 'other_thread.h', tid=1),
+		]
+
+		self.assertEqual(sorted(self.profiler.self_times(events)),
+						 [('deep.h', 50.0), ('inner.h', 10.0), ('other_thread.h', 20.0), ('outer.h', 40.0)])
+
+	def test_parse_time_trace_sums_headers_and_templates(self):
+		path = os.path.join(self.tmp.name, 'A.cpp.json')
+		with open(path, 'w') as f:
+			json.dump({'traceEvents': [
+				trace_event('Source', 0, 30000, 'a.h'),
+				trace_event('Source', 5000, 10000, 'b.h'),
+				trace_event('Source', 40000, 5000, 'b.h'),
+				trace_event('InstantiateClass', 50000, 4000, 'Foo<int>'),
+				trace_event('InstantiateFunction', 51000, 1000, 'bar<int>'),
+				trace_event('Total Source', 0, 45000),
+			]}, f)
+
+		headers, templates = self.profiler.parse_time_trace(path)
+
+		self.assertEqual(headers, {'a.h': 20.0, 'b.h': 15.0})
+		self.assertEqual(templates, {'Foo<int>': 3.0, 'bar<int>': 1.0})
+
+	def test_parse_time_report_subtracts_msvc_nested_includes(self):
+		lines = [
+			'Include Headers:',
+			'\tCount: 3',
+			'\tc:\\plugin\\a.h: 0.500000s',
+			'\t\tc:\\plugin\\b.h: 0.200000s',
+			'\t\t\tc:\\plugin\\c.h: 0.050000s',
+			'\tc:\\plugin\\d.h: 0.100000s',
+			'Class Definitions:',
+			'\tFoo<int>: 0.030000s',
+			'Function Definitions:',
+			'\tbar: 0.300000s',
+		]
+
+		headers, templates = self.profiler.parse_time_report(lines)
+
+		self.assertEqual({name: round(ms, 3) for name, ms in headers.items()},
+						 {'c:\\plugin\\a.h': 300.0, 'c:\\plugin\\b.h': 150.0,
+						  'c:\\plugin\\c.h': 50.0, 'c:\\plugin\\d.h': 100.0})
+		self.assertEqual(templates, {'Foo<int>': 30.0})
+
+	def test_parse_time_report_reads_gcc_wall_column(self):
+		lines = [
+			'Time variable                                   usr           sys          wall           GGC',
+			' phase parsing                      :   0.40 ( 50%)   0.01 ( 10%)   0.52 ( 50%)  1234k ( 40%)',
+			' template instantiation             :   0.10 ( 10%)   0.00 (  0%)   0.12 ( 10%)   234k ( 10%)',
+			' TOTAL                              :   0.80          0.10          1.04          3086k',
+		]
+
+		headers, templates = self.profiler.parse_time_report(lines)
+
+		self.assertEqual(headers, {'<parsing>': 520.0})
+		self.assertEqual(templates, {'<instantiation>': 120.0})
+
+	def test_parse_time_report_finds_gcc_wall_without_usr_and_sys(self):
+		lines = [
+			'Time variable                                   wall           GGC',
+			' phase parsing                      :   0.50 ( 50%)  1234k ( 40%)',
+		]
+
+		headers, _ = self.profiler.parse_time_report(lines)
+
+		self.assertEqual(headers, {'<parsing>': 500.0})
+
+	def test_collect_output_keeps_latest_compile_of_each_tu(self):
+		for line in ['[1/2] Building CXX object CMakeFiles/P.dir/source/A.cpp.obj', 'first',
+					 '[1/1] Building CXX object CMakeFiles/P.dir/source/A.cpp.obj', 'second']:
+			self.profiler.collect_output(line)
+		self.profiler.mark()
+
+		self.assertEqual(self.profiler.compiler_output, {'CMakeFiles/P.dir/source/A.cpp.obj': ['second']})
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,222 @@
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source'))
+
+from BuildServer import BuildClient, BuildServer, normalize_dir
+
+STAND_IN_TOOL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stand_in_tool.py')
+TOKEN = 'test-token'
+
+
+class BuildServerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.root = self.tmp.name
+		for name in ('A', 'B'):
+			os.makedirs(os.path.join(self.root, 'PluginProjects', name, 'source'))
+			with open(os.path.join(self.root, 'PluginProjects', name, 'CMakeLists.txt'), 'w') as f:
+				f.write("# {'plugin_type': 'CHOP'}\n")
+
+		env = dict(os.environ)
+		env['STAND_IN_SLEEP'] = '0.3'
+		self.server = BuildServer(TOKEN, [self.root], port=0, env=env,
+								  cmake=[sys.executable, STAND_IN_TOOL, 'cmake'],
+								  ninja=[sys.executable, STAND_IN_TOOL, 'ninja'],
+								  poll_interval=0.05)
+		self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.server_thread.start()
+		self.host, self.port = self.server.address
+		self.clients = []
+
+	def tearDown(self):
+		for client in self.clients:
+			client.close()
+		self.server.shutdown()
+		self.server_thread.join(timeout=5)
+		self.tmp.cleanup()
+
+	def project(self, name):
+		return os.path.join(self.root, 'PluginProjects', name)
+
+	def connect(self, token=TOKEN):
+		client = BuildClient(token, self.host, self.port)
+		self.clients.append(client)
+		return client
+
+	def wait_events(self, client, count, kind='finished', timeout=10):
+		"""Returns (time, event) of all events until count events of kind arrived."""
+
+		events = []
+		deadline = time.monotonic() + timeout
+		while sum(event['event'] == kind for _, event in events) < count:
+			try:
+				event = client.events.get(timeout=max(deadline - time.monotonic(), 0))
+			except queue.Empty:
+				self.fail(f"timed out waiting for {count} {kind} events, got {events}")
+			events.append((time.monotonic(), event))
+		return events
+
+	def test_dedupes_pending_jobs_and_runs_project_jobs_in_order(self):
+		client = self.connect()
+		client.submit(self.project('A'), 'configure', 'Release')
+		events = self.wait_events(client, 1, kind='started')
+
+		# the configure job is running, the first build waits and the others are the same job
+		for _ in range(3):
+			client.submit(self.project('A'), 'build', 'Release')
+		events += self.wait_events(client, 2)
+
+		queued = [event for _, event in events if event['event'] == 'queued']
+		self.assertEqual([event['deduped'] for event in queued], [False, False, True, True])
+		self.assertEqual(len({event['job'] for event in queued}), 2)
+
+		lifecycle = [(event['event'], event['kind']) for _, event in events if event['event'] in ('started', 'finished')]
+		self.assertEqual(lifecycle, [('started', 'configure'), ('finished', 'configure'),
+									 ('started', 'build'), ('finished', 'build')])
+
+		finished = [event for _, event in events if event['event'] == 'finished']
+		self.assertTrue(all(event['returncode'] == 0 for event in finished))
+		dll = os.path.join(self.root, 'Plugins', 'A', 'A.dll')
+		self.assertEqual(finished[-1]['artifact'], dll)
+		self.assertTrue(os.path.exists(dll))
+
+	def test_builds_different_projects_in_parallel(self):
+		client = self.connect()
+		client.submit(self.project('A'), 'configure', 'Release')
+		client.submit(self.project('B'), 'configure', 'Release')
+		events = self.wait_events(client, 2)
+
+		times = {}
+		for at, event in events:
+			if event['event'] in ('started', 'finished'):
+				times[(event['build_dir'], event['event'])] = at
+
+		a, b = normalize_dir(self.project('A')), normalize_dir(self.project('B'))
+		self.assertLess(times[(b, 'started')], times[(a, 'finished')])
+		self.assertLess(times[(a, 'started')], times[(b, 'finished')])
+
+	def write_source(self, name, text):
+		with open(os.path.join(self.project(name), 'source', 'Plugin.cpp'), 'w') as f:
+			f.write(text)
+
+	def wait_until(self, condition, timeout=5):
+		deadline = time.monotonic() + timeout
+		while not condition():
+			if time.monotonic() > deadline:
+				self.fail("timed out waiting for the build server")
+			time.sleep(0.02)
+
+	def test_watch_builds_once_per_source_change(self):
+		client = self.connect()
+		client.submit(self.project('A'), 'configure', 'Release')
+		self.wait_events(client, 1)
+
+		client.watch(self.project('A'), 'Release')
+		self.wait_until(lambda: normalize_dir(self.project('A')) in self.server.watches)
+		self.write_source('A', 'int main() { return 0; }\n')
+		events = self.wait_events(client, 1)
+
+		# no further builds without further changes
+		time.sleep(0.5)
+		while not client.events.empty():
+			events.append((time.monotonic(), client.events.get_nowait()))
+
+		started = [event for _, event in events if event['event'] == 'started']
+		self.assertEqual([event['kind'] for event in started], ['build'])
+		self.assertEqual(started[0]['log_offset'], 0)
+
+		finished = [event for _, event in events if event['event'] == 'finished']
+		self.assertEqual(finished[0]['returncode'], 0)
+		self.assertEqual(finished[0]['artifact'], os.path.join(self.root, 'Plugins', 'A', 'A.dll'))
+
+	def test_drops_watch_of_unwatching_and_disconnected_clients(self):
+		build_dir = normalize_dir(self.project('A'))
+		client = self.connect()
+		client.watch(self.project('A'), 'Release')
+		self.wait_until(lambda: build_dir in self.server.watches)
+		client.unwatch(self.project('A'))
+		self.wait_until(lambda: build_dir not in self.server.watches)
+
+		client.watch(self.project('A'), 'Release')
+		self.wait_until(lambda: build_dir in self.server.watches)
+		client.close()
+		self.wait_until(lambda: build_dir not in self.server.watches and build_dir not in self.server.subscribers)
+
+		self.write_source('A', 'int main() { return 1; }\n')
+		time.sleep(0.3)
+		self.assertFalse(self.server.pending)
+		self.assertFalse(os.path.exists(os.path.join(self.project('A'), 'build')))
+
+	def raw_request(self, data):
+		"""Sends raw bytes and returns everything the server answers before closing the connection."""
+
+		with socket.create_connection((self.host, self.port), timeout=5) as sock:
+			sock.sendall(data)
+			received = b''
+			while True:
+				chunk = sock.recv(4096)
+				if not chunk:
+					return received
+				received += chunk
+
+	def test_closes_connection_on_invalid_requests(self):
+		marker = os.path.join(self.root, 'PWNED')
+		body = json.dumps({'op': 'submit', 'build_dir': self.project('A'), 'commands': [f'touch {marker}']})
+		http = f"POST / HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\n\r\n{body}\n"
+
+		requests = [
+			http.encode('utf-8'),
+			(body + '\n').encode('utf-8'),
+			(json.dumps({'op': 'submit', 'token': 'wrong', 'build_dir': self.project('A'),
+						 'kind': 'build', 'config': 'Release'}) + '\n').encode('utf-8'),
+			(json.dumps({'op': 'submit', 'token': TOKEN, 'build_dir': self.root,
+						 'kind': 'build', 'config': 'Release'}) + '\n').encode('utf-8'),
+			(json.dumps({'op': 'submit', 'token': TOKEN, 'build_dir': self.project('A'),
+						 'kind': 'build', 'config': 'Release; rm -rf /'}) + '\n').encode('utf-8'),
+		]
+		for data in requests:
+			answer = [json.loads(line) for line in self.raw_request(data).splitlines()]
+			self.assertEqual([event['event'] for event in answer], ['error'])
+
+		time.sleep(0.5)
+		self.assertFalse(os.path.exists(marker))
+		self.assertFalse(os.path.exists(os.path.join(self.project('A'), 'build')))
+
+	def test_client_notices_refused_token_and_stopped_server(self):
+		refused = self.connect('wrong')
+		refused.subscribe(self.project('A'))
+		self.assertTrue(refused.disconnected.wait(5))
+		self.assertEqual(refused.events.get(timeout=1)['event'], 'error')
+
+		client = self.connect()
+		client.subscribe(self.project('A'))
+		self.assertFalse(client.disconnected.wait(0.2))
+
+		self.server.shutdown()
+		self.server_thread.join(timeout=5)
+		# the handler threads are daemons, closing the listening socket does not end
+		# their connections, so the server process going away is simulated here
+		self.server.server.server_close()
+		with self.server.lock:
+			handlers = {handler for clients in self.server.subscribers.values() for handler in clients}
+		for handler in handlers:
+			handler.request.shutdown(socket.SHUT_RDWR)
+
+		self.assertTrue(client.disconnected.wait(5))
+		with self.assertRaises(OSError):
+			for _ in range(10):
+				client.submit(self.project('A'), 'build', 'Release')
+				time.sleep(0.05)
+
+
+if __name__ == '__main__':
+	unittest.main()
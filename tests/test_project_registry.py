@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source'))
+
+from ProjectRegistry import ProjectRegistry
+
+
+class ProjectRegistryTest(unittest.TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.projects_dir = os.path.join(self.tmp.name, 'PluginProjects')
+		os.makedirs(self.projects_dir)
+		self.registry = ProjectRegistry(self.projects_dir)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def write_cmake(self, name, header):
+		os.makedirs(os.path.join(self.projects_dir, name), exist_ok=True)
+		path = os.path.join(self.projects_dir, name, 'CMakeLists.txt')
+		with open(path, 'w') as f:
+			f.write(f"{header}\ncmake_minimum_required(VERSION 3.16)\n")
+		return path
+
+	def write_dll(self, name, data):
+		path = os.path.join(self.tmp.name, 'Plugins', name, f"{name}.dll")
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, 'wb') as f:
+			f.write(data)
+		return path
+
+	def test_parse_header_reads_old_and_new_headers(self):
+		old = self.write_cmake('Old', "# {'plugin_type': 'CHOP'}")
+		new = self.write_cmake('New', "# {'plugin_type': 'TOP', 'template': 'CudaTOP'}")
+
+		self.assertEqual(self.registry.parse_header(old), {'plugin_type': 'CHOP'})
+		self.assertEqual(self.registry.parse_header(new), {'plugin_type': 'TOP', 'template': 'CudaTOP'})
+
+	def test_parse_header_never_evaluates_code(self):
+		marker = os.path.join(self.tmp.name, 'PWNED')
+		headers = [
+			f"# __import__('os').mkdir({marker!r})",
+			f"# {{'plugin_type': __import__('os').mkdir({marker!r})}}",
+			"# ['CHOP']",
+			"# {'plugin_type': 'CHOP'",
+			"cmake_minimum_required(VERSION 3.16)",
+		]
+		for header in headers:
+			self.assertEqual(self.registry.parse_header(self.write_cmake('Evil', header)), {})
+		self.assertFalse(os.path.exists(marker))
+
+	def test_update_parses_only_changed_files(self):
+		path = self.write_cmake('A', "# {'plugin_type': 'CHOP', 'template': 'BasicCHOP'}")
+		self.assertEqual(self.registry.update('A')['plugin_type'], 'CHOP')
+
+		with mock.patch.object(self.registry, 'parse_header', wraps=self.registry.parse_header) as parse_header:
+			self.registry.update('A')
+			parse_header.assert_not_called()
+
+			self.write_cmake('A', "# {'plugin_type': 'TOP', 'template': 'CPUMemoryTOP'}")
+			os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+			self.assertEqual(self.registry.update('A')['plugin_type'], 'TOP')
+			parse_header.assert_called_once()
+
+	def test_update_reads_build_options_from_cmake_cache(self):
+		self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		self.assertEqual(self.registry.update('A')['build_options'], {})
+
+		os.makedirs(os.path.join(self.projects_dir, 'A', 'build'))
+		with open(os.path.join(self.projects_dir, 'A', 'build', 'CMakeCache.txt'), 'w') as f:
+			f.write("// comment\nCMAKE_BUILD_TYPE:STRING=Release\nPLUGIN_BUILDER_PROFILE:BOOL=ON\nOTHER:STRING=x\n")
+
+		self.assertEqual(self.registry.update('A')['build_options'],
+						 {'CMAKE_BUILD_TYPE': 'Release', 'PLUGIN_BUILDER_PROFILE': 'ON'})
+
+	def test_update_and_refresh_drop_deleted_projects(self):
+		a = self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		self.write_cmake('B', "# {'plugin_type': 'DAT'}")
+		self.registry.refresh()
+		self.assertEqual(set(self.registry.projects), {'A', 'B'})
+
+		os.remove(a)
+		self.assertIsNone(self.registry.update('A'))
+		self.assertNotIn('A', self.registry.projects)
+
+		os.remove(os.path.join(self.projects_dir, 'B', 'CMakeLists.txt'))
+		os.rmdir(os.path.join(self.projects_dir, 'B'))
+		self.registry.refresh()
+		self.assertEqual(self.registry.projects, {})
+
+		with open(self.registry.path, 'r') as f:
+			self.assertEqual(json.load(f), {})
+
+	def test_last_good_artifact_survives_a_reload(self):
+		self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		dll = self.write_dll('A', b'good build')
+		self.registry.record_artifact('A', dll)
+
+		self.assertEqual(ProjectRegistry(self.projects_dir).last_good_artifact('A'), dll)
+
+	def test_last_good_artifact_rejects_changed_stamp(self):
+		self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		dll = self.write_dll('A', b'good build')
+		self.registry.record_artifact('A', dll)
+
+		self.write_dll('A', b'broken build, longer')
+		self.assertIsNone(self.registry.last_good_artifact('A'))
+
+	def test_last_good_artifact_rejects_changed_hash(self):
+		self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		dll = self.write_dll('A', b'good build')
+		self.registry.record_artifact('A', dll)
+		mtime_ns = os.stat(dll).st_mtime_ns
+
+		# same size and modification time, different contents
+		self.write_dll('A', b'evil build')
+		os.utime(dll, ns=(mtime_ns, mtime_ns))
+		self.assertIsNone(self.registry.last_good_artifact('A'))
+
+	def test_last_good_artifact_rejects_missing_dll(self):
+		self.write_cmake('A', "# {'plugin_type': 'CHOP'}")
+		dll = self.write_dll('A', b'good build')
+		self.registry.record_artifact('A', dll)
+
+		os.remove(dll)
+		self.assertIsNone(self.registry.last_good_artifact('A'))
+		self.assertIsNone(self.registry.last_good_artifact('Unknown'))
+
+
+if __name__ == '__main__':
+	unittest.main()